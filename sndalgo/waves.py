@@ -1,24 +1,167 @@
+import math
+
+import numba as nb
 import numpy as np
 
 SAMPLING_RATE = 48000
 TWO_PI = np.pi * 2.0
 
+# taylor coefficients of sin(x) up to x ** 11, good to ~6e-8 on [-pi/2, pi/2]
+_S3 = -1.0 / 6.0
+_S5 = 1.0 / 120.0
+_S7 = -1.0 / 5040.0
+_S9 = 1.0 / 362880.0
+_S11 = -1.0 / 39916800.0
+
+# one cycle of sine, with a guard point so interpolation never wraps
+_SIN_LUT_BITS = 14
+_SIN_LUT_SIZE = 1 << _SIN_LUT_BITS
+_SIN_LUT = np.sin(TWO_PI * np.arange(_SIN_LUT_SIZE + 1) / _SIN_LUT_SIZE)
+
+
+def _broadcast(freq, t):
+    """
+    flattens `freq` and `t` for the compiled kernels, broadcasting them
+    against each other like numpy would.
+
+    @returns (freq, t, shape, step); `step` is 0 for a scalar freq, which is
+             then passed as a single element instead of being copied per sample
+    """
+
+    freq = np.asarray(freq, dtype=np.float64)
+    t = np.asarray(t)
+
+    if freq.ndim == 0:
+        return freq.reshape(1), t.ravel(), t.shape, 0
+
+    freq, t = np.broadcast_arrays(freq, t)
+    return freq.ravel(), t.ravel(), t.shape, 1
+
 
 def sine(freq, t, srate=SAMPLING_RATE) -> np.ndarray:
     """
     this generates a sine wave for the given time integer array `t`
+
+    the phase is reduced to a quarter cycle and the sine is evaluated with an
+    odd polynomial in horner form, so no libm call is made per sample.
+    scalars and lists are accepted, like np.sin, and keep their shape; an
+    array `freq` is broadcast against `t`, e.g. a per-sample frequency.
+    """
+
+    freq, t, shape, step = _broadcast(freq, t)
+    return _sine(freq, step, t, srate).reshape(shape)[()]
+
+
+@nb.njit(fastmath=True, cache=True, inline="always")
+def _sin_cycle(x):
+    """
+    sin(2 pi x), with x in cycles.
+    """
+
+    x -= np.floor(x + 0.5)
+
+    # sin(2 pi x) is symmetric about the quarter cycle
+    a = min(abs(x), 0.5 - abs(x)) * TWO_PI
+    a2 = a * a
+
+    y = a * (1.0 + a2 * (_S3 + a2 * (_S5 + a2 * (_S7 + a2 * (_S9 + a2 * _S11)))))
+    return math.copysign(y, x)
+
+
+@nb.njit(fastmath=True, parallel=True, cache=True)
+def _sine(freq, step, t, srate):
+    """
+    the compiled kernel for `sine`, over a 1-d `t`; sample i uses freq[i * step].
+    """
+
+    n = t.shape[0]
+    out = np.empty(n)
+    inv = 1.0 / srate
+
+    # a scalar freq gets its own loop so the increment stays a constant
+    if step == 0:
+        incr = freq[0] * inv
+
+        for i in nb.prange(n):
+            out[i] = _sin_cycle(t[i] * incr)
+    else:
+        for i in nb.prange(n):
+            out[i] = _sin_cycle(t[i] * (freq[i] * inv))
+
+    return out
+
+
+def sine_lut(freq, t, srate=SAMPLING_RATE) -> np.ndarray:
+    """
+    generates a sine wave for the given time integer array `t` by linearly
+    interpolating a precomputed table, shared by every call
+
+    the kernel is a single serial pass, so it skips the thread dispatch of
+    `sine` and is the faster of the two for short buffers (up to a few
+    thousand samples); the error against np.sin is ~2e-8
     """
 
-    return np.sin(TWO_PI * freq * t / srate)
+    t = np.asarray(t)
+    return _sine_lut(freq, t.ravel(), srate).reshape(t.shape)[()]
+
+
+@nb.njit(fastmath=True, cache=True)
+def _sine_lut(freq, t, srate):
+    """
+    the compiled kernel for `sine_lut`, over a 1-d `t`.
+    """
+
+    n = t.shape[0]
+    out = np.empty(n)
+    incr = freq * _SIN_LUT_SIZE / srate
+
+    for i in range(n):
+        pos = t[i] * incr
+        idx = np.floor(pos)
+        frac = pos - idx
+
+        k = np.int64(idx) & (_SIN_LUT_SIZE - 1)
+        lo = _SIN_LUT[k]
+        out[i] = lo + frac * (_SIN_LUT[k + 1] - lo)
+
+    return out
 
 
 def square_digital(freq, t, srate=SAMPLING_RATE) -> np.ndarray:
     """
-    generates a digitally (ideal) square wave using a sine wave and
-    signedness
+    generates a digitally (ideal) square wave straight from the phase: high
+    for the first half of each cycle and low for the second, which is the
+    sign of the sine wave without computing it. `freq` broadcasts against
+    `t` like it does in `sine`.
     """
 
-    return np.sign(sine(freq, t, srate))
+    freq, t, shape, step = _broadcast(freq, t)
+    return _square_digital(freq, step, t, srate).reshape(shape)[()]
+
+
+@nb.njit(fastmath=True, parallel=True, cache=True)
+def _square_digital(freq, step, t, srate):
+    """
+    the compiled kernel for `square_digital`, over a 1-d `t`; sample i uses
+    freq[i * step].
+    """
+
+    n = t.shape[0]
+    out = np.empty(n)
+    inv = 1.0 / srate
+
+    if step == 0:
+        incr = freq[0] * inv
+
+        for i in nb.prange(n):
+            x = t[i] * incr
+            out[i] = 1.0 if x - np.floor(x) < 0.5 else -1.0
+    else:
+        for i in nb.prange(n):
+            x = t[i] * (freq[i] * inv)
+            out[i] = 1.0 if x - np.floor(x) < 0.5 else -1.0
+
+    return out
 
 
 def square_harms(nharms) -> np.ndarray:
@@ -33,27 +176,61 @@ def square_harms(nharms) -> np.ndarray:
     return out
 
 
-def square_analog(freq, t, nharms, srate=SAMPLING_RATE) -> np.ndarray:
+def square_analog(freq, t, nharms=None, srate=SAMPLING_RATE) -> np.ndarray:
     """
     outputs an analog calculation of a square wave dependent on the number
     of harmonics desired
 
-    this outputs a 1:2 Hz square wave, which is the only real way to replicate
-    an analog square as it seems
+    the first `nharms` odd harmonics are weighted by 4 / (harm * pi) and
+    summed per sample, so no (harmonic, sample) matrix is ever allocated;
+    each harmonic comes from the previous two by the chebyshev recurrence
+    sin((h + 2) x) = 2 cos(2 x) sin(h x) - sin((h - 2) x), so only one sin
+    and one cos are computed per sample.
+    if `nharms` is None, the ideal square from `square_digital` is returned.
+
+    the wave is evaluated over the given time integer array `t`, like
+    `sine`, and has the same length. it used to ignore `t` and always return
+    `srate` samples of a 1:2 Hz wave over linspace(-1, 1).
     """
 
-    t_ = t
-    t = np.linspace(-1.0, 1.0, srate)
+    if nharms is None:
+        return square_digital(freq, t, srate)
 
-    out = np.zeros(srate)
+    t = np.asarray(t)
+    return _square_analog(freq, t.ravel(), nharms, srate).reshape(t.shape)[()]
 
-    for harm in range(1, 2 * nharms, 2):
-        # out += (4 / (harm * np.pi)) * np.sin(2 * np.pi * harm * freq * t)
-        # out += (4 / (harm * np.pi)) * np.sin(2 * np.pi * harm * freq * t)
-        out += -(4 / (harm * np.pi)) * np.sin(np.pi * harm * freq * t)
 
-    mx = np.max(np.abs(out))
-    out /= mx
+@nb.njit(fastmath=True, parallel=True, cache=True)
+def _square_analog(freq, t, nharms, srate):
+    """
+    the compiled harmonic sum for `square_analog`.
+    """
+
+    odd = np.arange(1, 2 * nharms, 2).astype(np.float64)
+    coef = (4.0 / np.pi) / odd
+    w = TWO_PI * freq / srate
+
+    n = t.shape[0]
+    out = np.empty(n)
+
+    for i in nb.prange(n):
+        x = t[i] * w
+        x -= TWO_PI * np.floor(x / TWO_PI)
+
+        c2 = 2.0 * math.cos(2.0 * x)
+        cur = math.sin(x)
+        prev = -cur
+        acc = 0.0
+
+        for k in range(odd.shape[0]):
+            acc += coef[k] * cur
+            cur, prev = c2 * cur - prev, cur
+
+        out[i] = acc
+
+    mx = np.abs(out).max()
+    if mx > 0.0:
+        out *= 1.0 / mx
 
     return out
 
@@ -62,18 +239,25 @@ def lookup_oscil(freq, t, wave, srate=SAMPLING_RATE):
     """
     takes a waveform lookup table and returns an array of amplitudes
     based on the given frequency
+
+    power-of-two table lengths wrap the index with a bitmask instead of
+    a modulus
     """
 
-    tablen = len(wave)
+    wave = np.asarray(wave, dtype=np.float64)
+    tablen = wave.shape[0]
     incr = freq * tablen / srate
 
-    out = np.zeros(len(t))
+    t = np.asarray(t)
+    idx = np.empty(t.shape[0], dtype=np.int64)
+    np.multiply(t, incr, out=idx, casting="unsafe")
 
-    for i, v in enumerate(t):
-        x = wave[int(v * incr) % tablen]
-        out[i] = x
+    if tablen & (tablen - 1) == 0:
+        idx &= tablen - 1
+    else:
+        idx %= tablen
 
-    return out
+    return wave[idx]
 
 
 def additive(bins, t, srate=SAMPLING_RATE, normalize=True):
@@ -84,21 +268,20 @@ def additive(bins, t, srate=SAMPLING_RATE, normalize=True):
     @param t: the time range to calculate for
     @param srate: the sampling rate for the calculation
     :param normalize: normalize to max of the abs of the array
+    @returns the waveform as an ndarray; the harmonics are summed with a
+             single matmul over the (harmonic, sample) phase matrix
     """
 
-    out = []
-
-    for i in t:
-        phs = []
-
-        for idx, j in enumerate(bins):
-            phs.append(j * sine(idx + 1, i, srate))
+    harms = np.arange(1, len(bins) + 1, dtype=np.float64)
+    phase = np.outer(harms * (TWO_PI / srate), t)
+    np.sin(phase, out=phase)
 
-        phs = sum(phs)
-        out.append(phs)
+    out = np.asarray(bins, dtype=np.float64) @ phase
 
     if normalize:
-        out = out / np.max(np.abs(out))
+        mx = np.abs(out).max()
+        if mx > 0.0:
+            out *= 1.0 / mx
 
     return out
 
@@ -30,6 +30,15 @@ computer science concepts like modulus are also good to know.
 __author__ = "John Harrington"
 __version__ = "0.023"
 
+from functools import cached_property
+from math import gcd
+
+import numpy as np
+
+_WS_TABLE = str.maketrans("", "", " \n\t\r")
+
+_INT64 = np.iinfo(np.int64)
+
 
 def clean_sieve_str(res: str) -> str:
     """
@@ -39,8 +48,7 @@ def clean_sieve_str(res: str) -> str:
     @returns the cleaned string.
     """
 
-    res = "".join(_ for _ in res.strip() if _ != " " and _ != "\n")
-    return res
+    return res.translate(_WS_TABLE)
 
 
 def parse_residual(res: str) -> tuple:
@@ -51,7 +59,13 @@ def parse_residual(res: str) -> tuple:
     @returns tuple representing (modulus, shift, is_negative)
     """
 
-    res = clean_sieve_str(res)
+    return _parse_residual_cleaned(clean_sieve_str(res))
+
+
+def _parse_residual_cleaned(res: str) -> tuple:
+    """
+    parses a residual string that has already been cleaned.
+    """
 
     if res[0] == "!" or res[0] == "-":
         neg = True
@@ -75,22 +89,30 @@ def parse_sieve_str(res: str) -> list:
     @returns a list of a list of tuples
     """
 
-    res = clean_sieve_str(res)
+    return _parse_cleaned(clean_sieve_str(res))
+
+
+def _parse_cleaned(res: str) -> list:
+    """
+    converts a sieve string that has already been cleaned, so the recursion
+    doesn't clean every substring again.
+    """
+
     groups = []
 
     if "|" in res:
         for group in res.split("|"):
-            groups.append(parse_sieve_str(group))
+            groups.append(_parse_cleaned(group))
 
         return groups
 
     if "&" in res:
         for residual in res.split("&"):
-            groups.append(parse_residual(residual))
+            groups.append(_parse_residual_cleaned(residual))
 
         return groups
 
-    groups.append(parse_residual(res))
+    groups.append(_parse_residual_cleaned(res))
 
     return groups
 
@@ -106,11 +128,27 @@ def in_residual(v: int, res: tuple) -> bool:
 
     mod, shift, neg = res
 
-    if mod == 1 or mod == 0:
+    if mod == 0:
         return not neg
 
-    truth = (v - shift) % mod == 0
-    return not truth if neg else truth
+    # a modulus of 1 needs no branch: (v - shift) % 1 == 0 always holds
+    return ((v - shift) % mod == 0) ^ neg
+
+
+def as_array(z) -> np.ndarray:
+    """
+    converts an iterable z into an array. anything other than an array, list,
+    tuple, or range--generators, sets, etc., which np.asarray would wrap as a
+    single object--is consumed into a list first.
+
+    @param z: the iterable
+    @returns the array
+    """
+
+    if not isinstance(z, (np.ndarray, list, tuple, range)):
+        z = list(z)
+
+    return np.asarray(z)
 
 
 def for_iter(res: tuple, z: list) -> list:
@@ -122,7 +160,60 @@ def for_iter(res: tuple, z: list) -> list:
     @returns the filtered iterable
     """
 
-    return list(n for n in z if in_residual(n, res))
+    z = as_array(z)
+    return z[for_iter_np(res, z)].tolist()
+
+
+def for_iter_np(res: tuple, z: np.ndarray) -> np.ndarray:
+    """
+    returns a boolean mask of the values of z that are valid for a residual.
+    masks of several residuals can be combined with & and | without building
+    any intermediate lists.
+
+    the modulus must be at least 1, as in every Sieve; use in_residual for
+    unchecked residuals.
+
+    @param res: the residual
+    @param z: the values, as an array
+    @returns the boolean mask
+    """
+
+    mod, shift, neg = res
+    z = as_array(z)
+
+    if not fits_int64(res):
+        z = z.astype(object)
+
+    return (z - shift) % mod != 0 if neg else (z - shift) % mod == 0
+
+
+def fits_int64(res: tuple) -> bool:
+    """
+    checks to see if a residual's modulus and shift fit in an int64, i.e. if
+    it can be tested against an integer array without overflowing.
+
+    @param res: the residual
+    @returns whether both fit
+    """
+
+    mod, shift, _ = res
+    return _INT64.min <= shift <= _INT64.max and mod <= _INT64.max
+
+
+def residual_expr(res: tuple, var: str = "z") -> str:
+    """
+    returns the source of a numpy expression testing an array against a
+    residual, with the modulus and shift folded in as constants. the modulus
+    must be at least 1, as in every Sieve.
+
+    @param res: the residual
+    @param var: the name of the array in the expression
+    @returns the expression source
+    """
+
+    mod, shift, neg = res
+
+    return f"(({var} - {shift}) % {mod} {'!=' if neg else '=='} 0)"
 
 
 def norm_residual(res: tuple) -> tuple:
@@ -140,45 +231,74 @@ def norm_residual(res: tuple) -> tuple:
     return res[0], res[1] % res[0], res[2]
 
 
-def simplify_group(group: list) -> list:
+def extgcd(a: int, b: int) -> tuple:
     """
-    simplifies a group--which are all &--into a single residual.
+    the extended euclidean algorithm.
 
-    @param group: the input group
-    @returns a new, single-element list with a simplified residual
+    @param a: the first integer
+    @param b: the second integer
+    @returns tuple (g, x, y) where g = gcd(a, b) = a * x + b * y
+    """
+
+    x0, x1, y0, y1 = 1, 0, 0, 1
+
+    while b:
+        q, a, b = a // b, b, a % b
+        x0, x1 = x1, x0 - q * x1
+        y0, y1 = y1, y0 - q * y1
+
+    return a, x0, y0
+
+
+def _merge_pair(a: tuple, b: tuple) -> tuple:
+    """
+    intersects two positive residuals into a single residual, using the
+    chinese remainder theorem.
+
+    @param a: the first residual
+    @param b: the second residual
+    @returns the merged residual
     """
 
-    if len(group) == 1:
-        return group
+    if a[2] or b[2]:
+        raise ValueError("negative residuals can't be merged into a single residual.")
+
+    # x = s1 (mod m1) and x = s2 (mod m2)
+    (m1, s1, _), (m2, s2, _) = a, b
+    g = gcd(m1, m2)
+
+    if (s2 - s1) % g:
+        raise ValueError("this combination of residuals has no true values.")
 
-    if len(group) == 2:
-        m = group[0][0] * group[1][0]
-        s = min([group[0][1], group[1][1]])
-        r = (m, s, False)
+    lcm = m1 // g * m2
+    _, p, _ = extgcd(m1 // g, m2 // g)
+    s = (s1 + (s2 - s1) // g * p * m1) % lcm
 
-        seek = 0
+    return lcm, s, False
 
-        while (
-                not all(
-                    [in_residual(s, r), in_residual(s, group[0]), in_residual(s, group[1])]
-                )
-                and seek <= m
-        ):
-            s += 1
-            r = (m, s, False)
-            seek += 1
 
-        if seek == m:
-            raise ValueError("this combination of residuals has no true values.")
+def simplify_group(group: list) -> list:
+    """
+    simplifies a group--which are all &--by merging its positive residuals
+    into a single residual. the intersection with a negative residual isn't
+    a residual, so negative residuals are kept as they are, after it.
+
+    @param group: the input group
+    @returns a new list with the simplified residual and any negative ones
+    """
+
+    pos = [residual for residual in group if not residual[2]]
+    neg = [residual for residual in group if residual[2]]
 
-        return [r]
+    if len(pos) < 2:
+        return list(group)
 
-    while len(group) >= 2:
-        end = group[2:]
-        simple = simplify_group(group[:2]) + end
-        group = simple
+    acc = pos[0]
 
-    return group
+    for residual in pos[1:]:
+        acc = _merge_pair(acc, residual)
+
+    return [acc] + neg
 
 
 class Sieve:
@@ -187,9 +307,10 @@ class Sieve:
     """
 
     __slots__ = {
-        "_residuals": "the private residuals list",
+        "_residuals": "the private residuals, a frozen tuple of groups",
         "_cur_group": 'the current group, "last" by default but is generally an integer'
                       " denoting the index of the group in _residuals",
+        "__dict__": "holds transpose, fmt, and the cached properties",
     }
 
     _fmt: str = "set"
@@ -206,8 +327,13 @@ class Sieve:
         @param m: the modulus, string, or sieve.
         @param s: the shift (or 0) for int input.
         @param n: if the sieve is negative or not for int input.
-        @param r: residuals (deprecated/under consideration).
+        @param r: residuals, as a list of groups of residual tuples; used
+                  over m when given.
         @param fmt: the default output format.
+
+        the residuals are frozen once constructed--& and | return new
+        sieves--so the properties derived from them are cached. transpose and
+        fmt can still be changed in place.
         """
 
         # self._transpose = 0
@@ -219,14 +345,17 @@ class Sieve:
         if fmt:
             self.fmt = fmt
 
-        if isinstance(m, str):
-            residuals = parse_sieve_str(m)
+        if r is not None:
+            residuals = [list(group) for group in r]
 
-            self._residuals = residuals
+            loaded = True
+
+        elif isinstance(m, str):
+            residuals = parse_sieve_str(m)
 
             loaded = True
 
-        if isinstance(m, int):
+        elif isinstance(m, int):
             if m == 0:
                 m = 1
 
@@ -234,12 +363,12 @@ class Sieve:
                 m *= -1
                 n = True
 
-            self._residuals = [[(m, s or 0, n or False)]]
+            residuals = [[(m, s or 0, n or False)]]
 
             loaded = True
 
-        if isinstance(m, Sieve):
-            self._residuals = m._residuals[:]
+        elif isinstance(m, Sieve):
+            residuals = m._residuals
 
             loaded = True
 
@@ -248,13 +377,19 @@ class Sieve:
                 f'the "m" argument is not of types `str`, `int`, or `Sieve`'
             )
 
-        if isinstance(self._residuals[0], tuple):
-            self._residuals = [self._residuals]
+        if not isinstance(residuals[0][0], tuple):
+            residuals = [residuals]
 
-        for idx, group in enumerate(self._residuals):
-            for jdx, residual in enumerate(group):
-                # noinspection PyTypeChecker
-                self._residuals[idx][jdx] = norm_residual(residual)
+        for group in residuals:
+            for residual in group:
+                if residual[0] < 1:
+                    raise ValueError(
+                        f"a residual modulus must be at least 1, got {residual[0]}"
+                    )
+
+        self._residuals = tuple(
+            tuple(norm_residual(residual) for residual in group) for group in residuals
+        )
 
     @property
     def fmt(self) -> str:
@@ -287,7 +422,7 @@ class Sieve:
                 f"[warn] `{new}` is not a possible option for Sieve.fmt; no changes made"
             )
 
-    @property
+    @cached_property
     def stype(self) -> str:
         """
         returns the complexity of the sieve as a string. possible:
@@ -305,46 +440,81 @@ class Sieve:
             return "simple"
 
     # noinspection PyTypeChecker
-    @property
+    @cached_property
     def simple(self) -> str:
         """
         returns a simplified sieve.
         """
 
-        sieves = [
-            Sieve(f"{x}@{y}")
-            for x, y, _ in [simplify_group(group)[0] for group in self._residuals]
-        ]
-        simple = sieves[0]
-        for sieve in sieves[1:]:
-            simple = simple | sieve
+        return Sieve(r=[simplify_group(group) for group in self._residuals])
 
-        return simple
+    def _compile(self):
+        """
+        builds the mask function for this sieve. the residuals are written out
+        as a single numpy expression, with the groups joined by & and |, and
+        compiled once--so after the first evaluation a sieve is effectively
+        jit-ed and no longer walks its residuals.
 
-    def set(self, z: list) -> list:
+        residuals too large for int64--which simplifying can produce--are
+        tested against an object copy of z, with python ints.
+
+        @returns the mask function
         """
-        returns a resolved sieve for an iterable z in the set format.
+
+        big = not all(
+            fits_int64(residual) for group in self._residuals for residual in group
+        )
+
+        src = " | ".join(
+            "("
+            + " & ".join(
+                residual_expr(residual, "z" if fits_int64(residual) else "zo")
+                for residual in group
+            )
+            + ")"
+            for group in self._residuals
+        )
+
+        body = "def mask(z):\n"
+        if big:
+            body += "    zo = z.astype(object)\n"
+        body += f"    return {src}\n"
+
+        namespace = {"np": np}
+        exec(compile(body, "<sieve>", "exec"), namespace)
+
+        return namespace["mask"]
+
+    @cached_property
+    def _mask_fn(self):
+        """
+        the compiled mask function, built on first use.
         """
 
-        res = []
+        return self._compile()
 
-        for group in self._residuals:
-            res_g = [for_iter(residual, z) for residual in group]
-            res_g = [v for v in z if all(v in r for r in res_g)]
+    def mask(self, z: list) -> np.ndarray:
+        """
+        returns a boolean mask of the valid values of an iterable z. the
+        groups are ANDed and then ORed together in one sweep over z.
+        """
 
-            res.append(res_g)
+        return self._mask_fn(as_array(z))
 
-        res = [v for v in z if any(v in g for g in res)]
+    def set(self, z: list) -> list:
+        """
+        returns a resolved sieve for an iterable z in the set format.
+        """
 
-        return res
+        z = as_array(z)
+        return z[self.mask(z)].tolist()
 
     def bin(self, z: list) -> list:
         """
         returns a resolved sieve for an iterable z in the bin format.
         """
 
-        set_ = self.set(z)
-        return list(1 if v in set_ else 0 for v in z)
+        return self.mask(z).astype(int).tolist()
 
     def delta(self, z: list) -> list:
         """
@@ -425,10 +595,7 @@ class Sieve:
                     for residual in other._residuals[0]
                 ]
 
-            new = Sieve(self)
-            new._residuals.append(push)
-
-            return new
+            return Sieve(r=list(self._residuals) + [push])
 
     def __and__(self, other) -> "Sieve":
         """
@@ -459,11 +626,10 @@ class Sieve:
                     for residual in other._residuals[0]
                 ]
 
-            # noinspection PyTypeChecker
-            new = Sieve(self)
-            new._residuals[-1 if self._cur_group == "last" else self._cur_group] += push
+            residuals = [list(group) for group in self._residuals]
+            residuals[-1 if self._cur_group == "last" else self._cur_group] += push
 
-            return new
+            return Sieve(r=residuals)
 
     def __add__(self, other) -> "Sieve":
         """